@@ -1,5 +1,20 @@
+import numpy as np
 import random
 import re
+from numba import njit
+
+_INT64_MAX = np.iinfo(np.int64).max
+
+@njit(cache=True, nogil=True)
+def _roll_core(num_dice, dice_sides, num_rolls, keep):
+    """Roll num_rolls sets of dice, returning each set sorted high to low and its kept total"""
+    rolls = np.empty((num_rolls, num_dice), np.int64)
+    totals = np.empty(num_rolls, np.int64)
+    for r in range(num_rolls):
+        row = np.sort(np.random.randint(1, dice_sides + 1, num_dice))[::-1]
+        rolls[r] = row
+        totals[r] = row[:keep].sum()
+    return rolls, totals
 
 class DiceRoller:
     def __init__(self, notation, num_rolls=1):
@@ -7,30 +22,49 @@ class DiceRoller:
         self.num_rolls = num_rolls
         self.dice_pattern = re.compile(r"(\d+)d(\d+)(k(\d+))?")
 
-    def roll_dice(self):
+        # Parse the notation once up front; the rolling itself is compiled
         match = self.dice_pattern.match(self.notation)
         if not match:
             raise ValueError("Invalid dice notation")
 
-        num_dice = int(match.group(1))
-        dice_sides = int(match.group(2))
-        keep = int(match.group(4)) if match.group(4) else num_dice
+        self.num_dice = int(match.group(1))
+        self.dice_sides = int(match.group(2))
+        self.keep = int(match.group(4)) if match.group(4) else self.num_dice
+        if self.dice_sides < 1:
+            raise ValueError("Invalid dice notation")
+
+        # The compiled kernel works in int64; anything bigger takes the Python path
+        self.use_jit = self.dice_sides < _INT64_MAX and self.num_dice * self.dice_sides <= _INT64_MAX
 
-        rolls = [random.randint(1, dice_sides) for _ in range(num_dice)]
-        rolls.sort(reverse=True)
-        kept_rolls = rolls[:keep]
+    def _roll(self, num_rolls):
+        """Roll num_rolls sets of dice, returning (rolls, totals) as Python lists"""
+        num_rolls = max(num_rolls, 0)
+        if self.use_jit:
+            rolls, totals = _roll_core(self.num_dice, self.dice_sides, num_rolls, self.keep)
+            return rolls.tolist(), totals.tolist()
+
+        rolls = [
+            sorted((random.randint(1, self.dice_sides) for _ in range(self.num_dice)), reverse=True)
+            for _ in range(num_rolls)
+        ]
+        return rolls, [sum(row[:self.keep]) for row in rolls]
+
+    def roll_dice(self):
+        rolls, _ = self._roll(1)
+        rolls = rolls[0]
+        kept_rolls = rolls[:self.keep]
 
         return rolls, kept_rolls
 
     def roll_multiple(self):
         """Roll the dice multiple times according to num_rolls"""
+        rolls, totals = self._roll(self.num_rolls)
         results = []
-        for _ in range(self.num_rolls):
-            rolls, kept_rolls = self.roll_dice()
+        for row, total in zip(rolls, totals):
             results.append({
-                "rolls": rolls,
-                "kept": kept_rolls,
-                "total": sum(kept_rolls)
+                "rolls": row,
+                "kept": row[:self.keep],
+                "total": total
             })
         return results
 
@@ -49,4 +83,4 @@ if __name__ == "__main__":
     notation = input("Enter dice notation (e.g., 2d20k1): ")
     num_rolls = int(input("Number of rolls: ") or "1")
     dice_roller = DiceRoller(notation, num_rolls)
-    print(dice_roller) 
\ No newline at end of file
+    print(dice_roller)
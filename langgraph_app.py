@@ -4,140 +4,213 @@ Demonstrates how LangGraph can work with MCP tools.
 """
 
 import asyncio
+import functools
+import inspect
 import os
+import re
+import string
+from cachetools import LRUCache
 from typing import Annotated, TypedDict
 from dotenv import load_dotenv
 from langgraph.graph import StateGraph, END
-from langchain_core.messages import HumanMessage, AIMessage
+from langgraph.graph.message import add_messages
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, ToolMessage
 from langchain_openai import ChatOpenAI
+from server import web_search, roll_dice, get_marketing_news, get_company_news
+
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 load_dotenv()
 
 class GraphState(TypedDict):
-    messages: Annotated[list, "The messages in the conversation"]
+    messages: Annotated[list, add_messages]  # The messages in the conversation
     user_intent: str
 
+# Intent keywords, in priority order
+_INTENT_KEYWORDS = {
+    "news": ["news", "marketing", "company", "companies", "business"],
+    "dice": ["dice", "roll", "rolls", "game", "random"],
+    "search": ["search", "web", "look up", "find"],
+}
+
+# Keyword -> intent, so classification is one dict lookup per token (or token pair,
+# for phrases like "look up")
+_WORD2INTENT = {word: intent for intent, words in _INTENT_KEYWORDS.items() for word in words}
+
+SYSTEM_PROMPT_TEMPLATE = """
+You are a helpful assistant with access to MCP tools. The user's intent is: {intent}
+
+Based on the user's message and intent, decide if you need to call one or more tools or respond directly.
+"""
+
+# System prompts are fixed per intent, so build them once rather than on every turn
+_SYSTEM_PROMPTS = {
+    intent: SystemMessage(content=SYSTEM_PROMPT_TEMPLATE.format(intent=intent))
+    for intent in [*_INTENT_KEYWORDS, "general"]
+}
+
+# LLM responses keyed on (intent, conversation); the model runs at temperature 0
+# so an identical conversation yields the same answer
+_response_cache = LRUCache(maxsize=256)
+
+# LLM calls still streaming, by the same key, so concurrent identical requests share one call
+_inflight_responses: dict[tuple, asyncio.Task] = {}
+
+# Legacy text protocol for models that reply with TOOL_CALL:tool_name:arg1=value1:arg2=value2
+_TOOL_PREFIX = "TOOL_CALL:"
+_ARG_RE = re.compile(r"(\w+)=([^:]+)")
+
+def _tool_calls(message) -> list[tuple[str, dict, str | None]]:
+    """Return the (tool_name, args, tool_call_id) triples requested by an agent message;
+    the id is None for calls made through the TOOL_CALL text protocol"""
+    if getattr(message, "tool_calls", None):
+        return [(tool_call["name"], tool_call["args"], tool_call["id"]) for tool_call in message.tool_calls]
+    
+    # Fall back to the TOOL_CALL text protocol, one call per line
+    content = message.content if isinstance(message.content, str) else ""
+    calls = []
+    for line in content.splitlines():
+        if line.startswith(_TOOL_PREFIX):
+            tool_name, _, arg_str = line[len(_TOOL_PREFIX):].partition(":")
+            args = {
+                key: int(value) if value.removeprefix("-").isdecimal() else value
+                for key, value in _ARG_RE.findall(arg_str)
+            }
+            calls.append((tool_name, args, None))
+    return calls
+
+# MCP server tools available to the agent, by name
+_TOOLS = {
+    "web_search": web_search,
+    "roll_dice": roll_dice,
+    "get_marketing_news": get_marketing_news,
+    "get_company_news": get_company_news,
+}
+
 class MCPToolRunner:
     """Calls actual MCP server tools"""
     
     async def call_tool(self, tool_name: str, **kwargs) -> str:
         """Call actual MCP server tools"""
         try:
-            # Import the actual tool functions directly
-            if tool_name == "web_search":
-                from server import web_search
-                return web_search(**kwargs)
-            elif tool_name == "roll_dice":
-                from server import roll_dice
-                return roll_dice(**kwargs)
-            elif tool_name == "get_marketing_news":
-                from server import get_marketing_news
-                return get_marketing_news(**kwargs)
-            elif tool_name == "get_company_news":
-                from server import get_company_news
-                return get_company_news(**kwargs)
-            else:
+            tool = _TOOLS.get(tool_name)
+            if tool is None:
                 return f"❌ Tool {tool_name} not found"
+            
+            # Plain `def` tools (like the ones students add to server.py) run in a
+            # worker thread so their blocking calls don't stall the loop
+            if inspect.iscoroutinefunction(tool):
+                return await tool(**kwargs)
+            return await asyncio.to_thread(tool, **kwargs)
                 
         except Exception as e:
             return f"❌ Error calling MCP tool {tool_name}: {str(e)}"
+    
+    async def call_tools(self, calls: list[tuple[str, dict]]) -> list[str]:
+        """Call several MCP server tools concurrently, returning results in order"""
+        return await asyncio.gather(
+            *(self.call_tool(tool_name, **args) for tool_name, args in calls)
+        )
 
-def classify_user_intent(state: GraphState) -> GraphState:
+def classify_user_intent(state: GraphState) -> dict:
     """Classify what the user wants to do based on their message"""
     messages = state["messages"]
-    last_message = messages[-1].content.lower()
+    last_message = messages[-1].content
     
     # Simple intent classification
-    if any(word in last_message for word in ["news", "marketing", "company", "business"]):
-        intent = "news"
-    elif any(word in last_message for word in ["dice", "roll", "game", "random"]):
-        intent = "dice"
-    elif any(word in last_message for word in ["search", "web", "look up", "find"]):
-        intent = "search"
-    else:
-        intent = "general"
+    tokens = [token.strip(string.punctuation) for token in last_message.lower().split()]
+    found = {_WORD2INTENT.get(token) for token in tokens}
+    found.update(_WORD2INTENT.get(f"{first} {second}") for first, second in zip(tokens, tokens[1:]))
+    intent = next((name for name in _INTENT_KEYWORDS if name in found), "general")
     
-    return {**state, "user_intent": intent}
+    # Only the changed key; LangGraph merges partial updates into the state
+    return {"user_intent": intent}
 
-def create_workflow():
-    """Create the LangGraph workflow"""
-    
-    # Create the LLM
-    llm = ChatOpenAI(
+@functools.cache
+def _llm() -> ChatOpenAI:
+    """Build the chat model once and share it across workflows"""
+    return ChatOpenAI(
         model="gpt-4o-mini",
-        temperature=0.1,
+        temperature=0,
         api_key=os.getenv("OPENAI_API_KEY")
     )
+
+def create_workflow():
+    """Create the LangGraph workflow"""
+    
+    # Get the shared LLM
+    llm = _llm()
     
     # Create MCP tool runner
     tool_runner = MCPToolRunner()
     
-    def agent(state: GraphState):
+    # Expose the MCP tools to the model through native tool calling
+    llm_with_tools = llm.bind_tools(list(_TOOLS.values()))
+    
+    async def stream_response(full_messages: list):
+        """Stream the response from the LLM so the event loop can serve other requests
+        while tokens arrive; chunks merge into one message, tool calls included"""
+        response = None
+        async for chunk in llm_with_tools.astream(full_messages):
+            response = chunk if response is None else response + chunk
+        return response
+    
+    async def agent(state: GraphState):
         """The main agent that decides what to do"""
         messages = state["messages"]
         user_intent = state.get("user_intent", "general")
         
-        # Create a system message based on intent
-        system_prompt = f"""
-        You are a helpful assistant with access to MCP tools. The user's intent is: {user_intent}
+        cache_key = (user_intent, tuple(msg.content for msg in messages))
+        if cache_key in _response_cache:
+            return {"messages": [_response_cache[cache_key]]}
         
-        Available MCP tools:
-        - web_search(query): Search the web for information
-        - roll_dice(notation, num_rolls): Roll dice with custom notation
-        - get_marketing_news(company, category, num_articles): Get marketing news
-        - get_company_news(company, num_articles): Get company-specific news
+        task = _inflight_responses.get(cache_key)
+        if task is None:
+            # Add the system message for this intent
+            full_messages = [_SYSTEM_PROMPTS[user_intent], *messages]
+            task = asyncio.create_task(stream_response(full_messages))
+            _inflight_responses[cache_key] = task
+            task.add_done_callback(lambda _: _inflight_responses.pop(cache_key, None))
         
-        Based on the user's message and intent, decide if you need to call a tool or respond directly.
-        If you need to call a tool, respond with: TOOL_CALL:tool_name:arg1=value1:arg2=value2
-        Otherwise, respond normally.
-        """
-        
-        # Add system message
-        full_messages = [{"role": "system", "content": system_prompt}] + messages
-        
-        # Get response from LLM
-        response = llm.invoke(full_messages)
+        # Shield the shared call so one cancelled caller doesn't cancel it for the others
+        response = await asyncio.shield(task)
+        _response_cache[cache_key] = response
         
         return {"messages": [response]}
     
-    def execute_tools(state: GraphState):
-        """Execute tools if the agent wants to use them"""
+    async def execute_tools(state: GraphState):
+        """Execute the tools the agent asked for; should_continue only routes here when there are some"""
         messages = state["messages"]
-        last_message = messages[-1].content
+        calls = _tool_calls(messages[-1])
         
-        # Check if the message contains a tool call
-        if last_message.startswith("TOOL_CALL:"):
-            # Parse the tool call
-            parts = last_message.split(":")
-            tool_name = parts[1]
-            
-            # Parse arguments
-            args = {}
-            for part in parts[2:]:
-                if "=" in part:
-                    key, value = part.split("=", 1)
-                    # Convert numeric values
-                    if value.isdigit():
-                        args[key] = int(value)
-                    else:
-                        args[key] = value
-            
-            # Execute the tool
-            tool_result = asyncio.run(tool_runner.call_tool(tool_name, **args))
-            
-            # Create a response with the tool result
-            response = f"I used the {tool_name} tool and got this result:\n\n{tool_result}"
-            
-            return {"messages": [AIMessage(content=response)]}
-        else:
-            return {"messages": [last_message]}
+        # Execute the tools concurrently
+        tool_results = await tool_runner.call_tools([(tool_name, args) for tool_name, args, _ in calls])
+        
+        # Native tool calls must be answered with one ToolMessage per tool_call_id,
+        # or the next turn's history is rejected by the OpenAI API
+        if calls[0][2] is not None:
+            return {"messages": [
+                ToolMessage(content=tool_result, tool_call_id=tool_call_id)
+                for (_, _, tool_call_id), tool_result in zip(calls, tool_results)
+            ]}
+        
+        # Create a response with the tool results for the text protocol
+        response = "\n\n".join(
+            f"I used the {tool_name} tool and got this result:\n\n{tool_result}"
+            for (tool_name, _, _), tool_result in zip(calls, tool_results)
+        )
+        
+        return {"messages": [AIMessage(content=response)]}
     
     def should_continue(state: GraphState) -> str:
         """Determine if we should continue or end"""
         messages = state["messages"]
-        last_message = messages[-1].content
+        last_message = messages[-1]
         
-        if last_message.startswith("TOOL_CALL:"):
+        if _tool_calls(last_message):
             return "execute_tools"
         else:
             return END
@@ -189,29 +262,37 @@ async def test_langgraph():
         "Find news about Tesla company"
     ]
     
-    for i, test in enumerate(tests, 1):
+    # Build every initial state up front so all requests can run concurrently
+    states = [
+        {
+            "messages": [HumanMessage(content=test)],
+            "user_intent": "general"
+        }
+        for test in tests
+    ]
+    
+    results = await asyncio.gather(
+        *(app.ainvoke(state) for state in states),
+        return_exceptions=True
+    )
+    
+    for i, (test, result) in enumerate(zip(tests, results), 1):
         print(f"\n📝 Test {i}: {test}")
         print("-" * 30)
         
-        try:
-            state = {
-                "messages": [HumanMessage(content=test)],
-                "user_intent": "general"
-            }
-            
-            result = await app.ainvoke(state)
-            
-            # Get AI response
-            ai_messages = [msg for msg in result["messages"] if hasattr(msg, 'content') and not isinstance(msg, HumanMessage)]
-            if ai_messages:
-                print(f"🤖 Response: {ai_messages[-1].content}")
-            else:
-                print("❌ No response")
-                
-        except Exception as e:
-            print(f"❌ Error: {e}")
+        if isinstance(result, Exception):
+            print(f"❌ Error: {result}")
+            continue
+        
+        # Get AI response
+        ai_messages = [msg for msg in result["messages"] if hasattr(msg, 'content') and not isinstance(msg, HumanMessage)]
+        if ai_messages:
+            print(f"🤖 Response: {ai_messages[-1].content}")
+        else:
+            print("❌ No response")
     
     print("\n✅ Test complete!")
 
 if __name__ == "__main__":
-    asyncio.run(test_langgraph())
\ No newline at end of file
+    run = uvloop.run if uvloop else asyncio.run
+    run(test_langgraph())
\ No newline at end of file
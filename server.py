@@ -1,30 +1,138 @@
 from dotenv import load_dotenv
+from cachetools import LRUCache, TTLCache
 from mcp.server.fastmcp import FastMCP
-from tavily import TavilyClient
-from newsapi import NewsApiClient
+import asyncio
+import httpx
+import json
 import os
+import weakref
 from dice_roller import DiceRoller
 
 load_dotenv()
 
 mcp = FastMCP("mcp-server")
-client = TavilyClient(os.getenv("TAVILY_API_KEY"))
-newsapi = NewsApiClient(api_key=os.getenv("NEWS_API_KEY"))
+
+TAVILY_SEARCH_URL = "https://api.tavily.com/search"
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+
+# Budget for web search context, matching get_search_context's 4000-token cap at ~4 characters per token
+MAX_SEARCH_CONTEXT_CHARS = 16000
+
+# One client per event loop: an httpx.AsyncClient's connections are bound to the
+# loop that opened them, so a client can't be reused after its loop closes
+_clients: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+def _http() -> httpx.AsyncClient:
+    """Shared async HTTP/2 client so Tavily and NewsAPI requests reuse connections"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = httpx.AsyncClient(
+            http2=True,
+            timeout=10,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
+        )
+    return client
+
+# Recent web search results, keyed on the query
+_search_cache = LRUCache(maxsize=512)
+
+# Recent news results, keyed on the tool arguments; entries expire so news stays fresh
+_news_cache = TTLCache(maxsize=256, ttl=900)
+
+async def _fetch_news(q: str, page_size: int) -> dict:
+    """Query the NewsAPI 'everything' endpoint and return the decoded JSON payload"""
+    response = await _http().get(
+        NEWS_API_URL,
+        params={
+            "q": q,
+            "language": "en",
+            "sortBy": "publishedAt",
+            "pageSize": min(page_size, 100)
+        },
+        headers={"X-Api-Key": os.getenv("NEWS_API_KEY") or ""}
+    )
+    response.raise_for_status()
+    return response.json()
+
+def _filter_articles(articles: list[dict], num_articles: int) -> list[dict]:
+    """Drop untitled or undescribed articles and wire-service reposts, keeping at most num_articles"""
+    seen = set()
+    filtered = []
+    for article in articles:
+        if not article.get('title') or not article.get('description'):
+            continue
+        key = (article['source']['name'], article['title'][:64])
+        if key in seen:
+            continue
+        seen.add(key)
+        filtered.append(article)
+        if len(filtered) >= num_articles:
+            break
+    return filtered
+
+def _format_article(i: int, article: dict) -> str:
+    """Format a single NewsAPI article as a numbered markdown entry"""
+    published = article['publishedAt'][:10]  # Just the date
+    return (
+        f"{i}. **{article['title']}**\n"
+        f"   📰 Source: {article['source']['name']}\n"
+        f"   📅 Published: {published}\n"
+        f"   📝 Description: {article['description']}\n"
+        f"   🔗 URL: {article['url']}\n\n"
+    )
+
+def _format_articles(header: str, articles: list[dict]) -> str:
+    """Join a header and the formatted articles into a single string in one pass"""
+    return header + "".join(_format_article(i, article) for i, article in enumerate(articles, 1))
 
 @mcp.tool()
-def web_search(query: str) -> str:
+async def web_search(query: str) -> str:
     """Search the web for information about the given query"""
-    search_results = client.get_search_context(query=query)
+    if query in _search_cache:
+        return _search_cache[query]
+    
+    response = await _http().post(
+        TAVILY_SEARCH_URL,
+        json={
+            "query": query,
+            "search_depth": "basic",
+            "max_results": 5,
+            "include_answer": False,
+            "include_raw_content": False,
+            "include_images": False
+        },
+        headers={"Authorization": f"Bearer {os.getenv('TAVILY_API_KEY')}"}
+    )
+    response.raise_for_status()
+    
+    # Same shape and limit as TavilyClient.get_search_context: a JSON list of
+    # url/content pairs, stopping at the first source that would exceed the budget
+    context = []
+    used = 0
+    for source in response.json().get("results", []):
+        item = {"url": source["url"], "content": source["content"]}
+        used += len(json.dumps(item))
+        if used > MAX_SEARCH_CONTEXT_CHARS:
+            break
+        context.append(item)
+    search_results = json.dumps(context)
+    _search_cache[query] = search_results
     return search_results
 
-@mcp.tool()
-def roll_dice(notation: str, num_rolls: int = 1) -> str:
-    """Roll the dice with the given notation"""
+def _roll(notation: str, num_rolls: int) -> str:
+    """Roll and format the dice synchronously"""
     roller = DiceRoller(notation, num_rolls)
     return str(roller)
 
 @mcp.tool()
-def get_marketing_news(company: str = None, category: str = "business", num_articles: int = 5) -> str:
+async def roll_dice(notation: str, num_rolls: int = 1) -> str:
+    """Roll the dice with the given notation"""
+    # Rolling is CPU-bound for large num_rolls, so keep it off the event loop
+    return await asyncio.to_thread(_roll, notation, num_rolls)
+
+@mcp.tool()
+async def get_marketing_news(company: str = None, category: str = "business", num_articles: int = 5) -> str:
     """
     Get the latest marketing and business news from companies like ZoomInfo, 6sense, and other marketing tech companies.
     
@@ -33,6 +141,10 @@ def get_marketing_news(company: str = None, category: str = "business", num_arti
         category: News category (default: 'business', options: 'business', 'technology', 'general')
         num_articles: Number of articles to return (default: 5, max: 100)
     """
+    cache_key = ("marketing", company, category, num_articles)
+    if cache_key in _news_cache:
+        return _news_cache[cache_key]
+    
     try:
         # Marketing tech companies and related keywords
         marketing_companies = [
@@ -48,30 +160,15 @@ def get_marketing_news(company: str = None, category: str = "business", num_arti
         else:
             query = "marketing technology OR martech OR sales technology OR business intelligence"
         
-        # Get news articles
-        articles = newsapi.get_everything(
-            q=query,
-            language='en',
-            sort_by='publishedAt',
-            page_size=min(num_articles, 100)
-        )
+        # Get news articles, over-fetching so filtering still leaves enough
+        articles = await _fetch_news(query, num_articles * 2)
+        filtered = _filter_articles(articles.get('articles', []), num_articles)
         
-        if articles['status'] == 'ok' and articles['totalResults'] > 0:
-            result = f"📈 Marketing News ({len(articles['articles'])} articles found):\n\n"
-            
-            for i, article in enumerate(articles['articles'][:num_articles], 1):
-                title = article['title']
-                description = article['description'] or "No description available"
-                source = article['source']['name']
-                url = article['url']
-                published = article['publishedAt'][:10]  # Just the date
-                
-                result += f"{i}. **{title}**\n"
-                result += f"   📰 Source: {source}\n"
-                result += f"   📅 Published: {published}\n"
-                result += f"   📝 Description: {description}\n"
-                result += f"   🔗 URL: {url}\n\n"
+        if articles['status'] == 'ok' and filtered:
+            header = f"📈 Marketing News ({len(filtered)} articles found):\n\n"
+            result = _format_articles(header, filtered)
             
+            _news_cache[cache_key] = result
             return result
         else:
             return f"❌ No marketing news found for query: {query}"
@@ -80,7 +177,7 @@ def get_marketing_news(company: str = None, category: str = "business", num_arti
         return f"❌ Error fetching marketing news: {str(e)}"
 
 @mcp.tool()
-def get_company_news(company: str, num_articles: int = 3) -> str:
+async def get_company_news(company: str, num_articles: int = 3) -> str:
     """
     Get specific news about a particular company (e.g., ZoomInfo, 6sense, etc.)
     
@@ -88,30 +185,19 @@ def get_company_news(company: str, num_articles: int = 3) -> str:
         company: Company name to search for
         num_articles: Number of articles to return (default: 3)
     """
+    cache_key = ("company", company, num_articles)
+    if cache_key in _news_cache:
+        return _news_cache[cache_key]
+    
     try:
-        articles = newsapi.get_everything(
-            q=f"{company}",
-            language='en',
-            sort_by='publishedAt',
-            page_size=min(num_articles, 100)
-        )
+        articles = await _fetch_news(f"{company}", num_articles * 2)
+        filtered = _filter_articles(articles.get('articles', []), num_articles)
         
-        if articles['status'] == 'ok' and articles['totalResults'] > 0:
-            result = f"🏢 {company} News ({len(articles['articles'])} articles found):\n\n"
-            
-            for i, article in enumerate(articles['articles'][:num_articles], 1):
-                title = article['title']
-                description = article['description'] or "No description available"
-                source = article['source']['name']
-                url = article['url']
-                published = article['publishedAt'][:10]
-                
-                result += f"{i}. **{title}**\n"
-                result += f"   📰 Source: {source}\n"
-                result += f"   📅 Published: {published}\n"
-                result += f"   📝 Description: {description}\n"
-                result += f"   🔗 URL: {url}\n\n"
+        if articles['status'] == 'ok' and filtered:
+            header = f"🏢 {company} News ({len(filtered)} articles found):\n\n"
+            result = _format_articles(header, filtered)
             
+            _news_cache[cache_key] = result
             return result
         else:
             return f"❌ No news found for company: {company}"
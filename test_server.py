@@ -1,6 +1,11 @@
 from mcp.client.stdio import stdio_client
 import asyncio
 
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
+
 async def main():
     # Connect via stdio to a local script
     from mcp.client.stdio import StdioServerParameters
@@ -15,24 +20,36 @@ async def main():
             tools_result = await session.list_tools()
             print(f"Available tools: {[tool.name for tool in tools_result.tools]}")
             
+            # Run the tool calls concurrently over the one session; JSON-RPC
+            # matches responses to requests by id so they can interleave
+            web_result, dice_result, news_result = await asyncio.gather(
+                session.call_tool("web_search", {"query": "What is the capital of France?"}),
+                session.call_tool("roll_dice", {"notation": "2d6", "num_rolls": 2}),
+                session.call_tool("get_marketing_news", {"company": "ZoomInfo", "num_articles": 2}),
+                return_exceptions=True
+            )
+            
             # Test web search
             print("\n=== Testing Web Search ===")
-            result = await session.call_tool("web_search", {"query": "What is the capital of France?"})
-            print(f"Web search result: {result.content[0].text[:200]}...")
+            if isinstance(web_result, Exception):
+                print(f"Web search error: {web_result}")
+            else:
+                print(f"Web search result: {web_result.content[0].text[:200]}...")
             
             # Test dice rolling
             print("\n=== Testing Dice Roll ===")
-            dice_result = await session.call_tool("roll_dice", {"notation": "2d6", "num_rolls": 2})
-            print(f"Dice roll result: {dice_result.content[0].text}")
+            if isinstance(dice_result, Exception):
+                print(f"Dice roll error: {dice_result}")
+            else:
+                print(f"Dice roll result: {dice_result.content[0].text}")
             
             # Test marketing news (this will fail without a real API key, but we can see the error)
             print("\n=== Testing Marketing News ===")
-            try:
-                news_result = await session.call_tool("get_marketing_news", {"company": "ZoomInfo", "num_articles": 2})
+            if isinstance(news_result, Exception):
+                print(f"Marketing news error (expected without real API key): {news_result}")
+            else:
                 print(f"Marketing news result: {news_result.content[0].text}")
-            except Exception as e:
-                print(f"Marketing news error (expected without real API key): {e}")
 
 if __name__ == "__main__":
-    import asyncio
-    asyncio.run(main())
\ No newline at end of file
+    run = uvloop.run if uvloop else asyncio.run
+    run(main())
\ No newline at end of file